@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from urllib.request import urlretrieve
+from typing import Any, Callable
 
 import duckdb
 import joblib
-import pandas as pd
+import numpy as np
+import orjson
+import requests
+from cachetools import TTLCache
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
+from threadpoolctl import ThreadpoolController
 
 
 # -----------------------
@@ -20,6 +30,43 @@ DB_PATH = Path("warehouse/hospital_ops.duckdb")
 # SQL files (in your repo)
 METRICS_SQL_PATH = Path("sql/metrics_queries.sql")
 
+# Column order of the model input (matches train_admission_model.py)
+FEATURE_COLUMNS = [
+    "age",
+    "gender",
+    "race",
+    "department_id",
+    "event_hour",
+    "event_dayofweek",
+    "wait_time_minutes",
+]
+
+# Artifact downloads (cold start)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+DOWNLOAD_TIMEOUT_SECONDS = 60
+
+# DuckDB settings for the shared read-only API connection (tune per deploy)
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", os.cpu_count() or 1))
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "512MB")
+
+# Metrics responses are cached in-process for this long. The API holds the
+# warehouse open read-only, so a rebuilt warehouse is served after a restart
+METRICS_CACHE_TTL_SECONDS = 300
+
+# Blocking work (model inference, DuckDB) runs here, off the event loop
+CPU_POOL_WORKERS = os.cpu_count() or 1
+
+# CPU_POOL already runs one batch per core; each predict_proba stays on its
+# own thread instead of opening an OpenMP team sized to every core
+PREDICT_OPENMP_THREADS = 1
+
+# Responses smaller than this are sent uncompressed
+GZIP_MINIMUM_SIZE = 1024
+
+# Micro-batching of concurrent /predict calls into one predict_proba
+MAX_BATCH = 64
+MAX_WAIT_MS = 5
+
 
 # -----------------------
 # FastAPI app
@@ -28,8 +75,12 @@ app = FastAPI(
     title="Hospital Operations ML API",
     version="0.1.0",
     description="Admission prediction + operational metrics (demo).",
+    default_response_class=ORJSONResponse,
 )
 
+# Metrics payloads are JSON arrays; compress anything worth compressing
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
 
 # -----------------------
 # Request / Response schemas
@@ -53,19 +104,56 @@ class AdmissionResponse(BaseModel):
 # Globals (loaded at startup)
 # -----------------------
 MODEL = None
+PREPROCESS = None
+THREADPOOL_CONTROLLER: ThreadpoolController | None = None
+DUCK_CON: duckdb.DuckDBPyConnection | None = None
+PREDICT_QUEUE: asyncio.Queue | None = None
+BATCHER_TASK: asyncio.Task | None = None
+METRICS_CACHE = TTLCache(maxsize=16, ttl=METRICS_CACHE_TTL_SECONDS)
+THREAD_STATE = threading.local()
+CPU_POOL = ThreadPoolExecutor(max_workers=CPU_POOL_WORKERS, thread_name_prefix="cpu")
 
 
 # -----------------------
 # Helpers
 # -----------------------
-def ensure_file(path: Path, env_var: str, friendly_name: str) -> None:
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_sha256(path: Path) -> str:
+    """
+    SHA256 of path, cached in a `<name>.sha256` sidecar so warm restarts
+    don't re-hash the file. The sidecar is ignored once the file is newer.
+    """
+    sidecar = path.with_name(path.name + ".sha256")
+    if sidecar.exists() and sidecar.stat().st_mtime >= path.stat().st_mtime:
+        return sidecar.read_text(encoding="utf-8").strip()
+
+    digest = file_sha256(path)
+    sidecar.write_text(digest, encoding="utf-8")
+    return digest
+
+
+def ensure_file(path: Path, env_var: str, friendly_name: str, sha_env_var: str) -> None:
     """
     Ensure a file exists locally. If missing, download from the URL in env_var.
+
+    When sha_env_var is set, an existing file is only kept if its SHA256
+    matches, and a download is rejected if it doesn't.
     """
     path.parent.mkdir(parents=True, exist_ok=True)
 
+    expected_sha = os.getenv(sha_env_var, "").strip().lower() or None
+
     if path.exists():
-        return
+        if expected_sha is None or cached_sha256(path) == expected_sha:
+            return
+        print(f"⚠️ {friendly_name} does not match {sha_env_var}, re-downloading")
 
     url = os.getenv(env_var)
     if not url:
@@ -75,7 +163,27 @@ def ensure_file(path: Path, env_var: str, friendly_name: str) -> None:
         )
 
     print(f"⬇️ Downloading {friendly_name} from {env_var} to {path} ...")
-    urlretrieve(url, path)  # noqa: S310
+
+    # Stream to a temp file in large chunks, hashing as we go
+    tmp_path = path.with_name(path.name + ".part")
+    digest = hashlib.sha256()
+    with requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS) as r:
+        r.raise_for_status()
+        with tmp_path.open("wb") as f:
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+
+    actual_sha = digest.hexdigest()
+    if expected_sha is not None and actual_sha != expected_sha:
+        tmp_path.unlink()
+        raise RuntimeError(
+            f"{friendly_name} checksum mismatch: expected {expected_sha}, "
+            f"got {actual_sha}. Check {env_var} / {sha_env_var}."
+        )
+
+    tmp_path.replace(path)
+    path.with_name(path.name + ".sha256").write_text(actual_sha, encoding="utf-8")
     print(f"✅ {friendly_name} downloaded")
 
 
@@ -128,18 +236,170 @@ def load_metrics_sql() -> dict[str, str]:
     return blocks
 
 
+def build_preprocessor_transform(encoding: dict) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Build a numpy-only encoder from the encoding saved with the model.
+
+    Mirrors encode_features() in train_admission_model.py: categorical columns
+    become their training category code (-1 when missing or unseen) and numeric
+    NaNs take the training median, stacked into one float32 matrix. Input is an
+    object array laid out as FEATURE_COLUMNS, so no DataFrame is built per request.
+    """
+    if encoding["features"] != FEATURE_COLUMNS:
+        raise RuntimeError(
+            f"Model was trained on {encoding['features']}, "
+            f"but the API sends {FEATURE_COLUMNS}."
+        )
+
+    numeric = []  # (column index, fill value)
+    categorical = []  # (column index, {category: code})
+
+    for i, col in enumerate(FEATURE_COLUMNS):
+        if col in encoding["categories"]:
+            categories = encoding["categories"][col]
+            categorical.append((i, {cat: code for code, cat in enumerate(categories)}))
+        else:
+            numeric.append((i, encoding["fill_values"][col]))
+
+    def transform(X: np.ndarray) -> np.ndarray:
+        out = np.empty(X.shape, dtype=np.float32)
+
+        for i, fill in numeric:
+            values = X[:, i].astype(np.float64)
+            values[np.isnan(values)] = fill
+            out[:, i] = values
+
+        for i, lookup in categorical:
+            out[:, i] = [lookup.get(value, -1) for value in X[:, i]]
+
+        return out
+
+    return transform
+
+
+def requests_to_array(reqs: list[AdmissionRequest]) -> np.ndarray:
+    """Stack requests into an object array in FEATURE_COLUMNS order."""
+    return np.array(
+        [
+            [
+                req.age,
+                req.gender,
+                req.race,
+                req.department_id,
+                req.event_hour,
+                req.event_dayofweek,
+                req.wait_time_minutes,
+            ]
+            for req in reqs
+        ],
+        dtype=object,
+    )
+
+
+def predict_probabilities(reqs: list[AdmissionRequest]) -> list[float]:
+    """Score all requests with a single predict_proba call."""
+    X = PREPROCESS(requests_to_array(reqs))
+    with THREADPOOL_CONTROLLER.limit(limits=PREDICT_OPENMP_THREADS, user_api="openmp"):
+        proba = MODEL.predict_proba(X)
+    return proba[:, 1].tolist()
+
+
+def to_response(proba: float) -> AdmissionResponse:
+    return AdmissionResponse(
+        admitted_probability=proba, admitted_prediction=int(proba >= 0.5)
+    )
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking call on CPU_POOL without stalling the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(CPU_POOL, fn, *args)
+
+
+async def predict_batcher() -> None:
+    """
+    Drain PREDICT_QUEUE into batches of up to MAX_BATCH requests, waiting at
+    most MAX_WAIT_MS after the first one, and resolve each request's future.
+    """
+    loop = asyncio.get_running_loop()
+
+    while True:
+        batch = [await PREDICT_QUEUE.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(PREDICT_QUEUE.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        reqs = [req for req, _ in batch]
+        try:
+            probas = await run_blocking(predict_probabilities, reqs)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            continue
+
+        for (_, future), proba in zip(batch, probas):
+            if not future.done():
+                future.set_result(proba)
+
+
 # Load SQL blocks once (on import)
 METRICS_QUERIES = load_metrics_sql()
 
 
-def duckdb_query_to_records(sql: str) -> list[dict]:
+def connect_warehouse() -> duckdb.DuckDBPyConnection:
+    """Open the long-lived read-only warehouse connection shared by requests."""
     con = duckdb.connect(str(DB_PATH), read_only=True)
-    df = con.execute(sql).fetchdf()
-    # Make dates JSON-friendly
-    for col in df.columns:
-        if "date" in col.lower():
-            df[col] = df[col].astype(str)
-    return df.to_dict(orient="records")
+    con.execute(f"PRAGMA threads={DUCKDB_THREADS}")
+    con.execute(f"PRAGMA memory_limit='{DUCKDB_MEMORY_LIMIT}'")
+    con.execute("PRAGMA enable_object_cache")
+    return con
+
+
+def warehouse_cursor() -> duckdb.DuckDBPyConnection:
+    """
+    Return this thread's cursor on DUCK_CON, with every named metrics query
+    PREPAREd on first use.
+
+    DuckDB prepared statements belong to the cursor that created them, so each
+    CPU_POOL thread keeps one cursor (which also keeps the shared connection
+    thread-safe) and re-executes the plans instead of re-parsing the SQL.
+    """
+    cur = getattr(THREAD_STATE, "cursor", None)
+    if cur is None:
+        cur = DUCK_CON.cursor()
+        for name, sql in METRICS_QUERIES.items():
+            cur.execute(f"PREPARE {name} AS {sql.rstrip(';')}")
+        THREAD_STATE.cursor = cur
+    return cur
+
+
+def duckdb_query_to_records(name: str) -> list[dict]:
+    table = warehouse_cursor().execute(f"EXECUTE {name}").fetch_arrow_table()
+    return table.to_pylist()
+
+
+def metrics_json(name: str) -> bytes:
+    """Run a named metrics query and encode the rows to JSON."""
+    # Date columns are already ISO text (strftime in the SQL), so rows go
+    # straight from Arrow to orjson with no per-column conversion
+    return orjson.dumps(duckdb_query_to_records(name))
+
+
+async def metrics_response(name: str) -> Response:
+    # METRICS_CACHE is only touched here, on the event loop, so it needs no
+    # lock and hits never queue behind inference on CPU_POOL
+    content = METRICS_CACHE.get(name)
+    if content is None:
+        content = await run_blocking(metrics_json, name)
+        METRICS_CACHE[name] = content
+    return Response(content=content, media_type="application/json")
 
 
 # -----------------------
@@ -147,52 +407,79 @@ def duckdb_query_to_records(sql: str) -> list[dict]:
 # -----------------------
 @app.on_event("startup")
 def startup() -> None:
-    global MODEL
+    global MODEL, PREPROCESS, THREADPOOL_CONTROLLER, DUCK_CON
 
     # Model + DB are downloaded in production (Render) via env vars
-    ensure_file(MODEL_PATH, "MODEL_URL", "Model file (admission_model.joblib)")
-    ensure_file(DB_PATH, "DB_URL", "DuckDB warehouse (hospital_ops.duckdb)")
+    ensure_file(
+        MODEL_PATH, "MODEL_URL", "Model file (admission_model.joblib)", "MODEL_SHA256"
+    )
+    ensure_file(
+        DB_PATH, "DB_URL", "DuckDB warehouse (hospital_ops.duckdb)", "DB_SHA256"
+    )
+
+    DUCK_CON = connect_warehouse()
 
-    MODEL = joblib.load(MODEL_PATH)
+    # Memory-mapped so worker processes share the tree arrays via the page cache
+    artifact = joblib.load(MODEL_PATH, mmap_mode="r")
+    MODEL = artifact["model"]
+    PREPROCESS = build_preprocessor_transform(artifact["encoding"])
+    # Inspect the loaded native thread pools once; limit() is then cheap per call
+    THREADPOOL_CONTROLLER = ThreadpoolController()
     print("✅ Model loaded")
 
 
+@app.on_event("shutdown")
+def shutdown() -> None:
+    CPU_POOL.shutdown(wait=False)
+    if DUCK_CON is not None:
+        DUCK_CON.close()
+
+
+@app.on_event("startup")
+async def start_predict_batcher() -> None:
+    global PREDICT_QUEUE, BATCHER_TASK
+
+    PREDICT_QUEUE = asyncio.Queue()
+    BATCHER_TASK = asyncio.create_task(predict_batcher())
+
+
+@app.on_event("shutdown")
+async def stop_predict_batcher() -> None:
+    if BATCHER_TASK is not None:
+        BATCHER_TASK.cancel()
+
+
 # -----------------------
 # Routes
 # -----------------------
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
 @app.post("/predict", response_model=AdmissionResponse)
-def predict(req: AdmissionRequest):
-    # Build one-row dataframe that matches training features
-    X = pd.DataFrame(
-        [{
-            "age": req.age,
-            "gender": req.gender,
-            "race": req.race,
-            "department_id": req.department_id,
-            "event_hour": req.event_hour,
-            "event_dayofweek": req.event_dayofweek,
-            "wait_time_minutes": req.wait_time_minutes,
-        }]
-    )
+async def predict(req: AdmissionRequest):
+    # Coalesced with concurrent requests by predict_batcher
+    future = asyncio.get_running_loop().create_future()
+    await PREDICT_QUEUE.put((req, future))
+    proba = await future
+
+    return to_response(proba)
 
-    proba = float(MODEL.predict_proba(X)[:, 1][0])
-    pred = int(proba >= 0.5)
 
-    return AdmissionResponse(admitted_probability=proba, admitted_prediction=pred)
+@app.post("/predict/batch", response_model=list[AdmissionResponse])
+async def predict_batch(reqs: list[AdmissionRequest]):
+    if not reqs:
+        return []
+    probas = await run_blocking(predict_probabilities, reqs)
+    return [to_response(proba) for proba in probas]
 
 
 @app.get("/metrics/department")
-def metrics_department():
-    sql = METRICS_QUERIES["department_metrics"]
-    return duckdb_query_to_records(sql)
+async def metrics_department():
+    return await metrics_response("department_metrics")
 
 
 @app.get("/metrics/daily-volume")
-def metrics_daily_volume():
-    sql = METRICS_QUERIES["daily_volume"]
-    return duckdb_query_to_records(sql)
+async def metrics_daily_volume():
+    return await metrics_response("daily_volume")
@@ -0,0 +1,125 @@
+-- ============================================================
+-- Gold layer incremental load (DuckDB)
+-- Appends encounters dated after the latest date already in
+-- fact_encounter, instead of rebuilding from the full Silver dataset.
+-- Run sql/create_gold_tables.sql (build_gold.py --full-refresh) for
+-- backfills or corrections to already-loaded dates.
+-- ============================================================
+
+-- Partition keys typed explicitly (event_year=NULL/ holds undated rows); the
+-- braces are doubled because build_gold.py fills this script with str.format
+CREATE OR REPLACE VIEW silver_encounters AS
+SELECT *
+FROM read_parquet(
+  'data/processed/encounters_clean/**/*.parquet',
+  hive_partitioning = true,
+  hive_types = {{'event_year': BIGINT, 'event_month': BIGINT}}
+);
+
+-- ------------------------------------------------------------
+-- New Silver rows only
+-- build_gold.py substitutes the cutoff (max fact_encounter.date_id) as
+-- literals: DuckDB only prunes Hive partitions on constant predicates, so
+-- the event_year/event_month filter skips whole files; event_date then
+-- trims the first (partially loaded) month.
+-- ------------------------------------------------------------
+CREATE OR REPLACE TEMP TABLE new_encounters AS
+SELECT s.*
+FROM silver_encounters s
+WHERE (
+    s.event_year > {cutoff_year}
+    OR (s.event_year = {cutoff_year} AND s.event_month >= {cutoff_month})
+  )
+  AND CAST(s.event_date AS DATE) > DATE '{max_date_id}';
+
+-- ------------------------------------------------------------
+-- Dimensions: add unseen dates / departments
+-- ------------------------------------------------------------
+INSERT INTO dim_date
+SELECT DISTINCT
+  CAST(event_date AS DATE)               AS date_id,
+  EXTRACT(year  FROM CAST(event_date AS DATE)) AS year,
+  EXTRACT(month FROM CAST(event_date AS DATE)) AS month,
+  EXTRACT(day   FROM CAST(event_date AS DATE)) AS day,
+  EXTRACT(dow   FROM CAST(event_date AS DATE)) AS day_of_week
+FROM new_encounters
+WHERE event_date IS NOT NULL;
+
+-- New departments get ids after the existing ones (existing ids never change)
+INSERT INTO dim_department
+SELECT
+  (SELECT coalesce(max(department_id), 0) FROM dim_department)
+    + ROW_NUMBER() OVER (ORDER BY department) AS department_id,
+  department
+FROM (
+  SELECT DISTINCT department
+  FROM new_encounters
+  WHERE department IS NOT NULL
+    AND lower(trim(CAST(department AS VARCHAR))) <> 'nan'
+    AND department NOT IN (SELECT department FROM dim_department)
+) d;
+
+-- ------------------------------------------------------------
+-- Fact table: append
+-- ------------------------------------------------------------
+INSERT INTO fact_encounter
+SELECT
+  s.patient_id,
+  CAST(s.event_date AS DATE)            AS date_id,
+  d.department_id                        AS department_id,
+  s.department                           AS department,
+  s.gender,
+  s.race,
+  CAST(s.age AS DOUBLE)                  AS age,
+  CAST(s.wait_time_minutes AS DOUBLE)    AS wait_time_minutes,
+  CAST(s.satisfaction_score AS DOUBLE)   AS satisfaction_score,
+  CAST(s.event_hour AS INTEGER)          AS event_hour,
+  CAST(s.event_dayofweek AS INTEGER)     AS event_dayofweek,
+  CAST(s.event_month AS INTEGER)         AS event_month,
+  CAST(s.admitted AS INTEGER)            AS admitted
+FROM new_encounters s
+LEFT JOIN dim_department d
+  ON s.department = d.department;
+
+-- ------------------------------------------------------------
+-- Gold aggregates
+-- ------------------------------------------------------------
+
+-- Daily volume: new dates never overlap loaded ones, so just append
+INSERT INTO gold_daily_volume
+SELECT
+  f.date_id AS event_date,
+  COUNT(*) AS total_encounters,
+  AVG(f.wait_time_minutes) AS avg_wait_time_minutes,
+  AVG(f.satisfaction_score) AS avg_satisfaction_score,
+  AVG(f.admitted) AS admission_rate
+FROM fact_encounter f
+WHERE f.date_id > DATE '{max_date_id}'
+GROUP BY f.date_id
+ORDER BY f.date_id;
+
+-- Department aggregates span all dates: recompute from the (local) fact table
+CREATE OR REPLACE TABLE gold_department_waits AS
+SELECT
+  department_id,
+  department,
+  COUNT(*) AS total_encounters,
+  AVG(wait_time_minutes) AS avg_wait_time_minutes,
+  AVG(satisfaction_score) AS avg_satisfaction_score,
+  AVG(admitted) AS admission_rate
+FROM fact_encounter
+GROUP BY department_id, department
+ORDER BY avg_wait_time_minutes DESC;
+
+CREATE OR REPLACE TABLE gold_department_metrics AS
+SELECT
+  d.department_id,
+  d.department,
+  COUNT(*)                 AS total_encounters,
+  AVG(f.wait_time_minutes) AS avg_wait_time_minutes,
+  AVG(f.admitted)          AS admission_rate
+FROM fact_encounter f
+JOIN dim_department d
+  ON f.department_id = d.department_id
+GROUP BY d.department_id, d.department
+ORDER BY total_encounters DESC;
@@ -0,0 +1,83 @@
+-- ============================================================
+-- Silver layer cleaning query (DuckDB)
+-- Reads:  raw_encounters (view over the raw CSV, every column VARCHAR)
+-- Output: one row per cleaned encounter; data_loader.py COPYs it to parquet
+--         partitioned by event_year/event_month
+-- ============================================================
+
+WITH deduplicated AS (
+  SELECT DISTINCT *
+  FROM raw_encounters
+),
+
+standardised AS (
+  SELECT
+    "Patient Id"                                   AS patient_id,
+    "Patient Admission Date"                       AS admission_date,
+    "Patient Admission Time"                       AS admission_time,
+
+    -- Fixed raw layout, e.g. "9/9/2024" + "9:25:00 AM". A single exact
+    -- format per column (no list of fallbacks tried row by row)
+    try_strptime("Merged", '%m/%d/%Y %I:%M:%S %p') AS merged_datetime,
+    try_strptime(
+      "Patient Admission Date" || ' ' || "Patient Admission Time",
+      '%m/%d/%Y %I:%M:%S %p'
+    )                                              AS arrival_datetime,
+
+    trim("Patient Gender")                         AS gender,
+    TRY_CAST("Patient Age" AS DOUBLE)              AS age,
+    trim("Patient Race")                           AS race,
+    trim("Department Referral")                    AS department,
+    TRY_CAST("Patient Satisfaction Score" AS DOUBLE) AS satisfaction_score,
+    TRY_CAST("Patient Waittime" AS DOUBLE)         AS wait_time_minutes,
+
+    -- Raw values confirmed from the dataset: "Admission" / "Not Admission"
+    CASE lower(trim("Patient Admission Flag"))
+      WHEN 'admission'     THEN 1
+      WHEN 'not admission' THEN 0
+      -- extra robustness (won't hurt)
+      WHEN '1'     THEN 1
+      WHEN '0'     THEN 0
+      WHEN 'true'  THEN 1
+      WHEN 'false' THEN 0
+      WHEN 'yes'   THEN 1
+      WHEN 'no'    THEN 0
+    END::TINYINT                                   AS admitted
+  FROM deduplicated
+),
+
+timed AS (
+  SELECT
+    *,
+    -- Prefer merged_datetime when available; otherwise use arrival_datetime
+    coalesce(merged_datetime, arrival_datetime)    AS event_datetime
+  FROM standardised
+)
+
+SELECT
+  patient_id,
+  admission_date,
+  admission_time,
+  merged_datetime,
+  gender,
+  age,
+  race,
+  department,
+  satisfaction_score,
+  wait_time_minutes,
+  arrival_datetime,
+  event_datetime,
+
+  -- Time-based features for forecasting/ops patterns
+  CAST(event_datetime AS DATE)                     AS event_date,
+  EXTRACT(hour  FROM event_datetime)               AS event_hour,
+  EXTRACT(isodow FROM event_datetime) - 1          AS event_dayofweek,  -- Mon=0
+  EXTRACT(month FROM event_datetime)               AS event_month,
+  EXTRACT(year  FROM event_datetime)               AS event_year,       -- partition key
+
+  admitted
+FROM timed
+-- Basic validity filters (adjust later if needed)
+WHERE (age IS NULL OR age BETWEEN 0 AND 120)
+  AND (wait_time_minutes IS NULL OR wait_time_minutes >= 0)
+  AND (satisfaction_score IS NULL OR satisfaction_score BETWEEN 0 AND 10)
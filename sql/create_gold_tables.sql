@@ -1,5 +1,6 @@
 -- ============================================================
--- Gold layer build script (DuckDB)
+-- Gold layer build script (DuckDB) - full rebuild
+-- (sql/append_gold_tables.sql loads only new dates into an existing build)
 -- Builds:
 --   - silver_encounters (view over parquet)
 --   - dim_date
@@ -7,23 +8,31 @@
 --   - fact_encounter
 --   - gold_daily_volume
 --   - gold_department_waits
+--   - gold_department_metrics
 -- ============================================================
 
 -- Make the build re-runnable
+DROP TABLE IF EXISTS gold_department_metrics;
 DROP TABLE IF EXISTS gold_department_waits;
 DROP TABLE IF EXISTS gold_daily_volume;
 DROP TABLE IF EXISTS fact_encounter;
-DROP TABLE IF EXISTS dim_department;
 DROP TABLE IF EXISTS dim_date;
+-- dim_department is NOT dropped: department_id is a model feature, so ids
+-- must survive a full rebuild (see the department dimension below)
 DROP VIEW  IF EXISTS silver_encounters;
 
 -- ------------------------------------------------------------
--- Silver layer: view over the parquet
--- Note: build_gold.py sets `silver_parquet_path` to parquet file
+-- Silver layer: view over the partitioned parquet dataset
+-- hive_types pins the partition keys: rows whose date failed to parse land in
+-- event_year=NULL/, which would otherwise make DuckDB read the keys as VARCHAR
 -- ------------------------------------------------------------
 CREATE VIEW silver_encounters AS
 SELECT *
-FROM read_parquet('data/processed/encounters_clean.parquet');
+FROM read_parquet(
+  'data/processed/encounters_clean/**/*.parquet',
+  hive_partitioning = true,
+  hive_types = {'event_year': BIGINT, 'event_month': BIGINT}
+);
 
 
 -- ------------------------------------------------------------
@@ -42,15 +51,24 @@ FROM silver_encounters
 WHERE event_date IS NOT NULL;
 
 -- Department dimension
-CREATE TABLE dim_department AS
+-- Existing ids are kept; unseen departments get ids after them (same rule as
+-- sql/append_gold_tables.sql), so a full rebuild never renumbers departments
+CREATE TABLE IF NOT EXISTS dim_department (
+  department_id BIGINT,
+  department    VARCHAR
+);
+
+INSERT INTO dim_department
 SELECT
-  ROW_NUMBER() OVER (ORDER BY department) AS department_id,
+  (SELECT coalesce(max(department_id), 0) FROM dim_department)
+    + ROW_NUMBER() OVER (ORDER BY department) AS department_id,
   department
 FROM (
   SELECT DISTINCT department
   FROM silver_encounters
   WHERE department IS NOT NULL
     AND lower(trim(CAST(department AS VARCHAR))) <> 'nan'
+    AND department NOT IN (SELECT department FROM dim_department)
 ) d;
 
 -- ------------------------------------------------------------
@@ -111,3 +129,18 @@ SELECT
 FROM fact_encounter
 GROUP BY department_id, department
 ORDER BY avg_wait_time_minutes DESC;
+
+-- Department metrics served by the API (/metrics/department):
+-- known departments only, already in the shape the endpoint returns
+CREATE TABLE gold_department_metrics AS
+SELECT
+  d.department_id,
+  d.department,
+  COUNT(*)                 AS total_encounters,
+  AVG(f.wait_time_minutes) AS avg_wait_time_minutes,
+  AVG(f.admitted)          AS admission_rate
+FROM fact_encounter f
+JOIN dim_department d
+  ON f.department_id = d.department_id
+GROUP BY d.department_id, d.department
+ORDER BY total_encounters DESC;
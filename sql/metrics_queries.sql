@@ -1,15 +1,19 @@
+-- ============================================================
+-- API metrics queries (loaded by app/main.py, one block per "-- name:")
+-- Each block is a plain scan of a pre-aggregated gold table built by
+-- sql/create_gold_tables.sql; keep GROUP BYs over fact_encounter
+-- out of this file so a request touches ~one row per date/department.
+-- ============================================================
+
 -- name: department_metrics
-SELECT
-  department,
-  total_encounters,
-  avg_wait_time_minutes,
-  admission_rate
-FROM gold_department_waits
+SELECT *
+FROM gold_department_metrics
 ORDER BY total_encounters DESC;
 
 -- name: daily_volume
+-- Dates leave DuckDB as ISO text so the API never converts them per row
 SELECT
-  event_date,
+  strftime(event_date, '%Y-%m-%d') AS event_date,
   total_encounters,
   avg_wait_time_minutes,
   admission_rate
@@ -1,29 +1,152 @@
 from __future__ import annotations
 
+import datetime as dt
+import os
+import sys
 from pathlib import Path
 import duckdb
 
 
 DB_PATH = Path("warehouse/hospital_ops.duckdb")
 SQL_PATH = Path("sql/create_gold_tables.sql")
+APPEND_SQL_PATH = Path("sql/append_gold_tables.sql")
+SILVER_PATH = Path("data/processed/encounters_clean")
+# Undated rows are written to event_year=NULL/; without explicit types DuckDB
+# then reads the partition keys as VARCHAR
+SILVER_HIVE_TYPES = "{'event_year': BIGINT, 'event_month': BIGINT}"
 
+# The same row, as stored in fact_encounter and as derived from Silver
+# (create_gold_tables.sql casts); used to check loaded rows are unchanged
+FACT_ROW_SQL = """
+  patient_id, date_id, department, gender, race, age, wait_time_minutes,
+  satisfaction_score, event_hour, event_dayofweek, event_month, admitted
+"""
+SILVER_ROW_SQL = """
+  patient_id, CAST(event_date AS DATE), department, gender, race,
+  CAST(age AS DOUBLE), CAST(wait_time_minutes AS DOUBLE),
+  CAST(satisfaction_score AS DOUBLE), CAST(event_hour AS INTEGER),
+  CAST(event_dayofweek AS INTEGER), CAST(event_month AS INTEGER),
+  CAST(admitted AS INTEGER)
+"""
 
-def main() -> None:
-    if not SQL_PATH.exists():
-        raise FileNotFoundError(f"SQL script not found: {SQL_PATH}")
+# DuckDB resources for the build (match the container budget)
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", os.cpu_count() or 1))
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "2GB")
+
+
+def has_gold_tables(con: duckdb.DuckDBPyConnection) -> bool:
+    count = con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'fact_encounter'"
+    ).fetchone()[0]
+    return count > 0
+
+
+def load_cutoff(con: duckdb.DuckDBPyConnection) -> dt.date:
+    """Latest date already in fact_encounter (the incremental load starts after it)."""
+    max_date_id = con.execute("SELECT max(date_id) FROM fact_encounter").fetchone()[0]
+    return max_date_id or dt.date(1900, 1, 1)
+
+
+def changed_silver_rows(con: duckdb.DuckDBPyConnection, cutoff: dt.date) -> int:
+    """
+    Count rows that differ between fact_encounter and the Silver rows an
+    incremental load would skip (dated up to the cutoff, or without a date).
+
+    data_loader.py rewrites all of Silver, so corrections to loaded dates and
+    new undated rows only show up here. A count + hash fingerprint is compared
+    first; the exact row diff only runs when it doesn't match.
+    """
+    loaded_silver = f"""
+        SELECT {SILVER_ROW_SQL}
+        FROM read_parquet(
+          '{SILVER_PATH.as_posix()}/**/*.parquet',
+          hive_partitioning = true,
+          hive_types = {SILVER_HIVE_TYPES}
+        )
+        WHERE (
+            event_year IS NULL
+            OR event_year < {cutoff.year}
+            OR (event_year = {cutoff.year} AND event_month <= {cutoff.month})
+          )
+          AND (event_date IS NULL OR CAST(event_date AS DATE) <= DATE '{cutoff.isoformat()}')
+    """
+    loaded_fact = f"SELECT {FACT_ROW_SQL} FROM fact_encounter"
+
+    # hash(r) hashes the whole row; the sum ignores row order
+    fingerprint = "SELECT COUNT(*), sum(hash(r)::HUGEINT) FROM ({rows}) r"
+    if (
+        con.execute(fingerprint.format(rows=loaded_silver)).fetchone()
+        == con.execute(fingerprint.format(rows=loaded_fact)).fetchone()
+    ):
+        return 0
+
+    return con.execute(
+        f"""
+        SELECT COUNT(*) FROM (
+          ({loaded_silver} EXCEPT ALL {loaded_fact})
+          UNION ALL
+          ({loaded_fact} EXCEPT ALL {loaded_silver})
+        )
+        """
+    ).fetchone()[0]
+
+
+def render_append_sql(cutoff: dt.date) -> str:
+    """
+    Fill the cutoff into the append script as literals, so the Silver
+    event_year/event_month filter can prune partitions at plan time.
+    """
+    return APPEND_SQL_PATH.read_text(encoding="utf-8").format(
+        max_date_id=cutoff.isoformat(),
+        cutoff_year=cutoff.year,
+        cutoff_month=cutoff.month,
+    )
+
+
+def main(full_refresh: bool = False) -> None:
+    """
+    Build the gold layer. An existing warehouse is updated incrementally
+    (only Silver partitions/dates newer than fact_encounter are appended) unless
+    full_refresh is set or already-loaded Silver rows changed, in which case
+    every table is rebuilt from scratch.
+    """
+    for path in (SQL_PATH, APPEND_SQL_PATH):
+        if not path.exists():
+            raise FileNotFoundError(f"SQL script not found: {path}")
 
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
     con = duckdb.connect(str(DB_PATH))
+    con.execute(f"PRAGMA threads={DUCKDB_THREADS}")
+    con.execute(f"PRAGMA memory_limit='{DUCKDB_MEMORY_LIMIT}'")
+    con.execute("PRAGMA enable_object_cache")
+
+    incremental = not full_refresh and has_gold_tables(con)
+    if incremental:
+        cutoff = load_cutoff(con)
+        changed = changed_silver_rows(con, cutoff)
+        if changed:
+            # An append would silently drop these rows: rebuild instead
+            print(
+                f"⚠️ {changed:,} Silver rows dated up to {cutoff} (or undated) differ "
+                "from fact_encounter; running a full rebuild"
+            )
+            incremental = False
 
-    sql_script = SQL_PATH.read_text(encoding="utf-8")
+    if incremental:
+        sql_script = render_append_sql(cutoff)
+    else:
+        sql_script = SQL_PATH.read_text(encoding="utf-8")
 
     con.execute(sql_script)
     con.close()
 
-    print("✅ Gold layer built successfully")
+    if incremental:
+        print("✅ Gold layer updated incrementally")
+    else:
+        print("✅ Gold layer built successfully")
     print(f"Saved DuckDB database to: {DB_PATH}")
 
 
 if __name__ == "__main__":
-    main()
+    main(full_refresh="--full-refresh" in sys.argv[1:])
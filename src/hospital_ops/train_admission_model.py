@@ -1,18 +1,18 @@
 from pathlib import Path
 import duckdb
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.impute import SimpleImputer
 from sklearn.metrics import roc_auc_score, classification_report
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier
 import joblib
 
 DB_PATH = Path("warehouse/hospital_ops.duckdb")
 MODEL_PATH = Path("models/admission_model.joblib")
 
+NUMERIC_FEATURES = ["age", "event_hour", "event_dayofweek", "wait_time_minutes"]
+CATEGORICAL_FEATURES = ["gender", "race", "department_id"]
+
 
 def load_training_data() -> pd.DataFrame:
     con = duckdb.connect(str(DB_PATH))
@@ -36,6 +36,44 @@ def load_training_data() -> pd.DataFrame:
     return df
 
 
+def build_encoding(X_train: pd.DataFrame) -> dict:
+    """
+    Learn the feature encoding from the training split.
+
+    Saved next to the model so the API can encode requests identically:
+      - categorical columns -> integer codes over the training categories
+      - numeric columns -> NaN filled with the training median
+    """
+    return {
+        "features": list(X_train.columns),
+        "categories": {
+            col: pd.Categorical(X_train[col]).categories.tolist()
+            for col in CATEGORICAL_FEATURES
+        },
+        "fill_values": {
+            col: float(
+                np.nanmedian(X_train[col].to_numpy(dtype=np.float64, na_value=np.nan))
+            )
+            for col in NUMERIC_FEATURES
+        },
+    }
+
+
+def encode_features(X: pd.DataFrame, encoding: dict) -> np.ndarray:
+    """Encode features into a single contiguous float32 matrix."""
+    columns = []
+    for col in encoding["features"]:
+        if col in encoding["categories"]:
+            # -1 for missing / unseen categories
+            codes = pd.Categorical(X[col], categories=encoding["categories"][col]).codes
+            columns.append(codes.astype(np.int16))
+        else:
+            values = X[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            columns.append(np.where(np.isnan(values), encoding["fill_values"][col], values))
+
+    return np.ascontiguousarray(np.column_stack(columns), dtype=np.float32)
+
+
 def main():
     df = load_training_data()
 
@@ -54,39 +92,25 @@ def main():
         X, y, test_size=0.2, random_state=42, stratify=y
     )
 
-    numeric_features = ["age", "event_hour", "event_dayofweek", "wait_time_minutes"]
-    categorical_features = ["gender", "race", "department_id"]
-
-    numeric_transformer = Pipeline(
-        steps=[("imputer", SimpleImputer(strategy="median"))]
-    )
-
-    categorical_transformer = Pipeline(
-        steps=[
-            ("imputer", SimpleImputer(strategy="most_frequent")),
-            ("onehot", OneHotEncoder(handle_unknown="ignore")),
-        ]
-    )
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("num", numeric_transformer, numeric_features),
-            ("cat", categorical_transformer, categorical_features),
-        ]
-    )
-
-    model = RandomForestClassifier(
-        n_estimators=300,
-        random_state=42,
+    # One encode pass instead of imputer + one-hot pipelines
+    encoding = build_encoding(X_train)
+    X_train_enc = encode_features(X_train, encoding)
+    X_test_enc = encode_features(X_test, encoding)
+
+    # Native categorical splits on the code columns (negative codes = missing)
+    model = HistGradientBoostingClassifier(
+        max_iter=300,
+        learning_rate=0.05,
+        categorical_features=[
+            encoding["features"].index(col) for col in CATEGORICAL_FEATURES
+        ],
         class_weight="balanced",
-        n_jobs=-1,
+        random_state=42,
     )
 
-    clf = Pipeline(steps=[("preprocessor", preprocessor), ("model", model)])
-
-    clf.fit(X_train, y_train)
+    model.fit(X_train_enc, y_train)
 
-    y_proba = clf.predict_proba(X_test)[:, 1]
+    y_proba = model.predict_proba(X_test_enc)[:, 1]
     y_pred = (y_proba >= 0.5).astype(int)
 
     auc = roc_auc_score(y_test, y_proba)
@@ -97,7 +121,8 @@ def main():
     print(classification_report(y_test, y_pred))
 
     MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(clf, MODEL_PATH)
+    # Keep uncompressed: the API loads it with mmap_mode="r"
+    joblib.dump({"model": model, "encoding": encoding}, MODEL_PATH)
     print(f"\n✅ Saved model to: {MODEL_PATH}")
 
 
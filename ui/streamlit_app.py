@@ -16,7 +16,6 @@ st.caption("Metrics + admission prediction powered by FastAPI + DuckDB + ML mode
 # ---------------------------
 # Helpers
 # ---------------------------
-@st.cache_data(ttl=300)
 def get_json(path: str):
     url = f"{API_BASE}{path}"
     r = requests.get(url, timeout=30)
@@ -30,6 +29,20 @@ def post_json(path: str, payload: dict):
     r.raise_for_status()
     return r.json()
 
+
+# Cached as parsed frames (one layer: get_json itself is not cached)
+@st.cache_data(ttl=300)
+def load_daily_volume() -> pd.DataFrame:
+    # Parsed and indexed once; every chart below reuses the same frame
+    df = pd.DataFrame(get_json("/metrics/daily-volume"))
+    df["event_date"] = pd.to_datetime(df["event_date"], errors="coerce")
+    return df.set_index("event_date")
+
+
+@st.cache_data(ttl=300)
+def load_department_metrics() -> pd.DataFrame:
+    return pd.DataFrame(get_json("/metrics/department")).set_index("department")
+
 # ---------------------------
 # Sidebar: Prediction form
 # ---------------------------
@@ -37,82 +50,92 @@ st.sidebar.header("Settings")
 st.sidebar.write("Backend API:")
 st.sidebar.code(API_BASE)
 
-st.sidebar.header("Admission Prediction")
-age = st.sidebar.number_input("Age", min_value=0, max_value=120, value=45)
-gender = st.sidebar.selectbox("Gender", ["Male", "Female", "Other"])
-race = st.sidebar.text_input("Race", value="White")
-department_id = st.sidebar.number_input("Department ID", min_value=0, value=1)
-event_hour = st.sidebar.slider("Event hour", 0, 23, 14)
-event_dayofweek = st.sidebar.slider("Day of week (Mon=0)", 0, 6, 2)
-wait_time_minutes = st.sidebar.number_input("Wait time (minutes)", min_value=0.0, value=30.0)
-
-if st.sidebar.button("Predict admission"):
-    payload = {
-        "age": float(age),
-        "gender": gender,
-        "race": race,
-        "department_id": int(department_id),
-        "event_hour": int(event_hour),
-        "event_dayofweek": int(event_dayofweek),
-        "wait_time_minutes": float(wait_time_minutes),
-    }
-    try:
-        pred = post_json("/predict", payload)
-        st.sidebar.success(f"Probability: {pred['admitted_probability']:.3f}")
-        st.sidebar.info(f"Prediction (>=0.5): {pred['admitted_prediction']}")
-    except Exception as e:
-        st.sidebar.error(f"Prediction failed: {e}")
+# Fragment: changing an input or predicting reruns only this form, not the tabs
+@st.fragment
+def prediction_form():
+    st.header("Admission Prediction")
+    age = st.number_input("Age", min_value=0, max_value=120, value=45)
+    gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+    race = st.text_input("Race", value="White")
+    department_id = st.number_input("Department ID", min_value=0, value=1)
+    event_hour = st.slider("Event hour", 0, 23, 14)
+    event_dayofweek = st.slider("Day of week (Mon=0)", 0, 6, 2)
+    wait_time_minutes = st.number_input("Wait time (minutes)", min_value=0.0, value=30.0)
+
+    if st.button("Predict admission"):
+        payload = {
+            "age": float(age),
+            "gender": gender,
+            "race": race,
+            "department_id": int(department_id),
+            "event_hour": int(event_hour),
+            "event_dayofweek": int(event_dayofweek),
+            "wait_time_minutes": float(wait_time_minutes),
+        }
+        try:
+            pred = post_json("/predict", payload)
+            st.success(f"Probability: {pred['admitted_probability']:.3f}")
+            st.info(f"Prediction (>=0.5): {pred['admitted_prediction']}")
+        except Exception as e:
+            st.error(f"Prediction failed: {e}")
+
+
+with st.sidebar:
+    prediction_form()
 
 # ---------------------------
 # Main dashboard tabs
 # ---------------------------
-tab1, tab2 = st.tabs(["📊 Daily Ops", "🏥 Departments"])
-
-with tab1:
+def daily_ops_tab():
     st.subheader("Daily patient volume (Gold layer)")
     try:
-        data = get_json("/metrics/daily-volume")
-        df = pd.DataFrame(data)
-
-        if "event_date" in df.columns:
-            df["event_date"] = pd.to_datetime(df["event_date"], errors="coerce")
+        df = load_daily_volume()
 
-        st.line_chart(df.set_index("event_date")["total_encounters"])
+        st.line_chart(df["total_encounters"])
 
         col1, col2 = st.columns(2)
         with col1:
             st.subheader("Avg wait time (daily)")
-            st.line_chart(df.set_index("event_date")["avg_wait_time_minutes"])
+            st.line_chart(df["avg_wait_time_minutes"])
         with col2:
             st.subheader("Admission rate (daily)")
-            st.line_chart(df.set_index("event_date")["admission_rate"])
+            st.line_chart(df["admission_rate"])
 
         st.dataframe(df, use_container_width=True)
     except Exception as e:
         st.error(f"Failed to load daily metrics: {e}")
 
-with tab2:
+
+def departments_tab():
     st.subheader("Department metrics")
     try:
-        data = get_json("/metrics/department")
-        df = pd.DataFrame(data)
+        df = load_department_metrics()
 
         df_top = df.head(15)
 
         st.subheader("Total encounters (top 15)")
-        st.bar_chart(df_top.set_index("department")["total_encounters"])
+        st.bar_chart(df_top["total_encounters"])
 
         col1, col2 = st.columns(2)
         with col1:
             st.subheader("Avg wait time by department (top 15)")
-            st.bar_chart(df_top.set_index("department")["avg_wait_time_minutes"])
+            st.bar_chart(df_top["avg_wait_time_minutes"])
         with col2:
             st.subheader("Admission rate by department (top 15)")
-            st.bar_chart(df_top.set_index("department")["admission_rate"])
+            st.bar_chart(df_top["admission_rate"])
 
         st.dataframe(df, use_container_width=True)
     except Exception as e:
         st.error(f"Failed to load department metrics: {e}")
 
+
+tab1, tab2 = st.tabs(["📊 Daily Ops", "🏥 Departments"])
+
+with tab1:
+    daily_ops_tab()
+
+with tab2:
+    departments_tab()
+
 st.markdown("---")
 st.caption("Streamlit frontend + FastAPI backend deployed on Render.")